@@ -7,45 +7,229 @@ Supported formats: .flac, .mp3, .m4a, .aac, .ogg, .wav (configurable).
 """
 
 import argparse
+import contextlib
+import hashlib
+import io
 import logging
+import os
+import queue
 import re
+import sqlite3
 import sys
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Iterator, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from mutagen import File as MutagenFile
 
+try:
+    import orjson  # optional, faster JSON parsing
+except ImportError:
+    orjson = None
+
 
 # ---- Config -----------------------------------------------------------------
 
 AUDIO_EXTS = {".flac", ".mp3", ".m4a", ".aac", ".ogg", ".wav"}
+AUDIO_EXTS_NO_DOT = {ext.lstrip(".") for ext in AUDIO_EXTS}
 LRCLIB_BASE_URL = "https://lrclib.net"
 REQUEST_TIMEOUT = 15  # seconds
-SLEEP_BETWEEN_REQUESTS = 0.3  # be gentle to the API
+MAX_WORKERS = 16  # tracks looked up concurrently (upper bound for the limiter)
+METADATA_CHUNKSIZE = 32  # tracks per batch sent to a tag-parsing process
+INITIAL_CONCURRENCY = 8  # in-flight requests to start with
+OK_STREAK_TO_GROW = 100  # consecutive successes before allowing one more request
+THROTTLE_STATUSES = {429, 503}
+THROTTLE_RETRIES = 4  # attempts per request while throttled
+SCAN_WORKERS = 8  # top-level directories walked concurrently
 CHECKED_ALBUMS_FILENAME = ".checked_albums.txt"
+CACHE_FILENAME = ".lyricfinder.cache.db"
+MISS_TTL = 7 * 24 * 3600  # seconds to remember "no lyrics found"
+CACHE_COMMIT_EVERY = 50  # rows per cache commit
+FILE_WRITTEN = "written"  # per-file outcomes recorded in the cache
+FILE_MISS = "miss"
+NEEDS_SEARCH = "needs-search"  # exact lookup missed, queued for the search phase
+WRITE_QUEUE_SIZE = 256  # .lrc files waiting for the writer threads
+WRITE_WORKERS = 4  # threads writing .lrc files
+HEAD_READ_BYTES = 1 << 20  # bytes read up front for header-only tag parsing
+# Formats whose tags and length can be read from the header alone. MP3 keeps
+# ID3v2 up front too, but its length may need the whole file (VBR, no Xing
+# header), so it only qualifies when duration isn't needed.
+HEAD_PARSE_EXTS = {".flac"}
+HEAD_PARSE_EXTS_NO_DURATION = {".mp3"}
+
+# Precompiled patterns used on every track
+_CD_RE = re.compile(r"^cd\s*\d+$", re.IGNORECASE)
+_TRACKNO_RE = re.compile(r"^\s*\d+\s*[-_.]\s*(.+)$")
 
 # ---- Helpers ----------------------------------------------------------------
 
 
+class AdaptiveLimiter:
+    """
+    AIMD limit on in-flight LRCLIB requests, shared by all worker threads.
+
+    Starts at `initial`; every throttling response (429/503) halves the limit,
+    and every OK_STREAK_TO_GROW consecutive successes raise it by one, up to
+    `maximum`. Retry-After from the server pauses all new requests.
+    """
+
+    def __init__(self, initial: int, maximum: int):
+        self.limit = initial
+        self.maximum = maximum
+        self.ok_streak = 0
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+            delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self, status: Optional[int]) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            if status in THROTTLE_STATUSES:
+                self.limit = max(1, self.limit // 2)
+                self.ok_streak = 0
+            elif status is not None and status < 400:
+                self.ok_streak += 1
+                if self.ok_streak >= OK_STREAK_TO_GROW and self.limit < self.maximum:
+                    self.limit += 1
+                    self.ok_streak = 0
+            self._cond.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def retry_after_seconds(resp: requests.Response) -> float:
+    """
+    Parse a Retry-After header given in seconds, defaulting to 1.
+    """
+    try:
+        return max(0.0, float(resp.headers.get("Retry-After", "1")))
+    except ValueError:
+        return 1.0
+
+
+def lrclib_get(
+    session: requests.Session,
+    limiter: AdaptiveLimiter,
+    url: str,
+    params: dict,
+) -> requests.Response:
+    """
+    GET from LRCLIB under the adaptive limiter, backing off and retrying
+    when the server throttles us.
+    """
+    for _ in range(THROTTLE_RETRIES):
+        limiter.acquire()
+        status = None
+        try:
+            resp = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            status = resp.status_code
+        finally:
+            limiter.release(status)
+
+        if status not in THROTTLE_STATUSES:
+            return resp
+        limiter.pause(retry_after_seconds(resp))
+
+    return resp
+
+
+def _list_dir(d: str) -> list[os.DirEntry]:
+    try:
+        with os.scandir(d) as it:
+            return list(it)
+    except OSError:
+        return []
+
+
+def _audio_entries(entries: list[os.DirEntry], subdirs: list[str]) -> Iterator[Tuple[os.DirEntry, bool]]:
+    """
+    Yield (entry, lrc_exists) for the audio files in one directory listing,
+    appending its subdirectories to `subdirs`. Filtering happens on the entry
+    name so non-audio files never cost a stat, and .lrc siblings are found via
+    a per-directory name set.
+    """
+    names = {e.name for e in entries}
+    for e in entries:
+        if e.is_dir(follow_symlinks=False):
+            subdirs.append(e.path)
+            continue
+
+        # Skip macOS resource-fork files like ._track.mp3
+        if e.name.startswith("._"):
+            continue
+
+        base, dot, ext = e.name.rpartition(".")
+        if not dot or ext.lower() not in AUDIO_EXTS_NO_DOT:
+            continue
+
+        if not e.is_file():
+            continue
+
+        yield e, base + ".lrc" in names
+
+
+def _scan_tree(top: str) -> list[Tuple[os.DirEntry, bool]]:
+    """
+    Sequentially walk one subtree, returning all of its audio entries.
+    """
+    found = []
+    stack = [top]
+    while stack:
+        found.extend(_audio_entries(_list_dir(stack.pop()), stack))
+    return found
+
+
+def iter_audio(root: Path) -> Iterator[Tuple[os.DirEntry, bool]]:
+    """
+    Walk the library with os.scandir, yielding (entry, lrc_exists) for every
+    audio file. Top-level (artist) directories are walked on a thread pool so
+    directory listing I/O overlaps on slow disks and network mounts.
+    """
+    top_dirs: list[str] = []
+    yield from _audio_entries(_list_dir(str(root)), top_dirs)
+
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+        futures = [pool.submit(_scan_tree, d) for d in top_dirs]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
 def normalize(s: str) -> str:
     """Normalize a string for fuzzy comparison."""
-    return re.sub(r"\s+", " ", s or "").strip().lower()
+    # str.split() with no arguments collapses whitespace runs and trims in C
+    return " ".join((s or "").split()).casefold()
 
 
-def infer_from_path(path: Path, library_root: Path) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+@lru_cache(maxsize=4096)
+def _dir_artist_album(parent: Path, library_root: Path) -> Tuple[Optional[str], Optional[str]]:
     """
-    Infer artist, title, album from the file path, given a library structured like:
-    artist/album[/CD1]/song.ext
+    Artist and album for every track in `parent`. Only depends on the
+    directory, so it is cached and shared by sibling tracks.
     """
-    artist = album = title = None
+    artist = album = None
 
     try:
-        rel_parts = path.relative_to(library_root).parts
+        rel_parts = parent.relative_to(library_root).parts
     except ValueError:
         # Fallback if the path is not under library_root for some reason
-        rel_parts = path.parts
+        rel_parts = parent.parts
 
     if len(rel_parts) >= 1:
         artist = rel_parts[0]
@@ -54,15 +238,26 @@ def infer_from_path(path: Path, library_root: Path) -> Tuple[Optional[str], Opti
         album = rel_parts[1]
 
         # Handle artist/album/CD1/song
-        if len(rel_parts) >= 3 and re.match(r"^cd\s*\d+$", rel_parts[2], re.IGNORECASE):
+        if len(rel_parts) >= 3 and _CD_RE.match(rel_parts[2]):
             album = f"{album} {rel_parts[2]}"
 
+    return artist, album
+
+
+def infer_from_path(path: Path, library_root: Path) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Infer artist, title, album from the file path, given a library structured like:
+    artist/album[/CD1]/song.ext
+    """
+    artist, album = _dir_artist_album(path.parent, library_root)
+    title = None
+
     # Title from filename
     stem = path.stem
     stem_clean = stem.replace("_", " ")
 
     # Strip track number prefixes like "01 - Song Name" or "01.Song Name"
-    m = re.match(r"^\s*\d+\s*[-_.]\s*(.+)$", stem_clean)
+    m = _TRACKNO_RE.match(stem_clean)
     if m:
         title = m.group(1).strip()
     else:
@@ -77,16 +272,63 @@ def infer_from_path(path: Path, library_root: Path) -> Tuple[Optional[str], Opti
     return artist or None, title or None, album or None
 
 
-def get_metadata(path: Path, library_root: Path) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[int]]:
+def read_duration(path: Path) -> Optional[int]:
+    """
+    Read just the track length in seconds with mutagen.
+    """
+    try:
+        audio = MutagenFile(path)
+        return int(round(audio.info.length))
+    except Exception:
+        return None
+
+
+def open_audio(path: Path, need_duration: bool = True):
+    """
+    Open a file with mutagen. For formats whose tags and stream info sit at
+    the start of the file, parse an in-memory copy of the first
+    HEAD_READ_BYTES instead, so the disk sees one sequential read rather than
+    many small ones. Falls back to a normal open if that doesn't work (e.g.
+    cover art pushing the tags past the header).
+    """
+    ext = path.suffix.lower()
+    if ext in HEAD_PARSE_EXTS or (not need_duration and ext in HEAD_PARSE_EXTS_NO_DURATION):
+        try:
+            with open(path, "rb") as f:
+                head = io.BytesIO(f.read(HEAD_READ_BYTES))
+            head.name = str(path)
+            audio = MutagenFile(head, easy=True)
+            if audio is not None:
+                return audio
+        except Exception:
+            pass
+
+    return MutagenFile(path, easy=True)
+
+
+def get_metadata(
+    path: Path,
+    library_root: Path,
+    need_duration: bool = True,
+) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[int]]:
     """
     Read metadata (artist, title, album, duration) using mutagen.
     Fall back to path-based inference where needed.
+
+    With need_duration=False, duration is always None (it may come from a
+    header-only parse and be wrong; see open_audio), and the file isn't
+    opened at all when the path already yields artist, title and album.
     """
+    if not need_duration:
+        inferred = infer_from_path(path, library_root)
+        if all(inferred):
+            return (*inferred, None)
+
     artist = title = album = None
     duration = None
 
     try:
-        audio = MutagenFile(path, easy=True)
+        audio = open_audio(path, need_duration)
     except Exception:
         audio = None
 
@@ -106,7 +348,7 @@ def get_metadata(path: Path, library_root: Path) -> Tuple[Optional[str], Optiona
         album = first("album")
 
         try:
-            if audio.info and hasattr(audio.info, "length"):
+            if need_duration and audio.info and hasattr(audio.info, "length"):
                 duration = int(round(audio.info.length))
         except Exception:
             duration = None
@@ -124,9 +366,15 @@ def get_metadata(path: Path, library_root: Path) -> Tuple[Optional[str], Optiona
     return artist, title, album, duration
 
 
-def choose_best_result(results, title: Optional[str], artist: Optional[str]):
+def choose_best_result(
+    results,
+    title: Optional[str],
+    artist: Optional[str],
+    duration: Optional[int] = None,
+):
     """
     Pick the best LRCLIB result based on normalized title/artist.
+    If duration is known, it breaks ties between equally good matches.
     """
     if not results:
         return None
@@ -137,6 +385,14 @@ def choose_best_result(results, title: Optional[str], artist: Optional[str]):
     norm_title = normalize(title or "")
     norm_artist = normalize(artist or "")
 
+    if not norm_title and not norm_artist:
+        return results[0]
+
+    # Nothing can beat a result matching everything we know, so stop there
+    max_score = 2 if norm_title and norm_artist else 1
+    if duration is not None:
+        max_score = max_score * 2 + 1
+
     best = None
     for r in results:
         r_title = normalize(r.get("trackName") or r.get("name") or "")
@@ -150,28 +406,90 @@ def choose_best_result(results, title: Optional[str], artist: Optional[str]):
                  1 if title_match or artist_match else
                  0)
 
+        if duration is not None:
+            r_duration = r.get("duration")
+            close = isinstance(r_duration, (int, float)) and abs(r_duration - duration) <= 2
+            score = score * 2 + (1 if close else 0)
+
+        if score == max_score:
+            return r
+
         if best is None or score > best[0]:
             best = (score, r)
 
     return best[1] if best else results[0]
 
 
-def fetch_lyrics_from_lrclib(
+def parse_json(resp: requests.Response):
+    """
+    Decode an LRCLIB response body, using orjson when it's installed.
+    """
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return resp.json()
+
+
+def lyrics_from_record(record: dict, logger: logging.Logger) -> Tuple[Optional[str], bool]:
+    """
+    Extract (lyrics_text, is_synced) from a single LRCLIB record.
+    """
+    if record.get("instrumental"):
+        logger.info("Instrumental track (no lyrics) according to LRCLIB.")
+        return None, False
+
+    synced = record.get("syncedLyrics") or ""
+    plain = record.get("plainLyrics") or ""
+
+    if synced.strip():
+        return synced, True
+    if plain.strip():
+        return plain, False
+
+    return None, False
+
+
+def query_lrclib(
     session: requests.Session,
+    limiter: AdaptiveLimiter,
     artist: Optional[str],
     title: Optional[str],
     album: Optional[str],
     duration: Optional[int],
     logger: logging.Logger,
-) -> Tuple[Optional[str], bool]:
+    duration_fn: Optional[Callable[[], Optional[int]]] = None,
+    exact: bool = True,
+    search: bool = True,
+) -> Optional[Tuple[Optional[str], bool]]:
     """
-    Fetch lyrics from LRCLIB.
+    Query LRCLIB over the network. Raises on request/HTTP errors so callers
+    can tell a failed lookup apart from a confirmed "no lyrics".
 
-    Returns (lyrics_text, is_synced), where is_synced indicates that lyrics
-    are already in LRC-ish format with timestamps.
+    When all of artist/title/album/duration are known, try the exact
+    /api/get lookup first and only fall back to /api/search on a 404.
+    If duration is unknown, duration_fn is called to get it only when the
+    search returns several candidates to pick between.
+
+    `exact` and `search` select which of the two lookups may run. Returns
+    None if the exact lookup didn't settle it and search is disabled.
     """
-    if not title and not artist:
-        return None, False
+    if exact and artist and title and album and duration:
+        params = {
+            "artist_name": artist,
+            "track_name": title,
+            "album_name": album,
+            "duration": duration,
+        }
+
+        resp = lrclib_get(session, limiter, f"{LRCLIB_BASE_URL}/api/get", params)
+        if resp.status_code != 404:
+            resp.raise_for_status()
+            record = parse_json(resp)
+            if isinstance(record, dict):
+                return lyrics_from_record(record, logger)
+            return None, False
+
+    if not search:
+        return None
 
     params = {}
 
@@ -186,34 +504,57 @@ def fetch_lyrics_from_lrclib(
 
     url = f"{LRCLIB_BASE_URL}/api/search"
 
-    try:
-        resp = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
-        resp.raise_for_status()
-        results = resp.json()
-    except Exception as e:
-        logger.warning("LRCLIB request failed for %s - %s: %s", artist, title, e)
-        return None, False
+    resp = lrclib_get(session, limiter, url, params)
+    resp.raise_for_status()
+    results = parse_json(resp)
 
     if not isinstance(results, list) or not results:
         return None, False
 
-    best = choose_best_result(results, title, artist)
+    if duration is None and duration_fn is not None and len(results) > 1:
+        duration = duration_fn()
+
+    best = choose_best_result(results, title, artist, duration)
     if not best:
         return None, False
 
-    if best.get("instrumental"):
-        logger.info("Instrumental track (no lyrics) according to LRCLIB.")
-        return None, False
+    return lyrics_from_record(best, logger)
 
-    synced = best.get("syncedLyrics") or ""
-    plain = best.get("plainLyrics") or ""
 
-    if synced.strip():
-        return synced, True
-    if plain.strip():
-        return plain, False
+def fetch_lyrics_from_lrclib(
+    session: requests.Session,
+    limiter: AdaptiveLimiter,
+    cache: "LyricsCache",
+    artist: Optional[str],
+    title: Optional[str],
+    album: Optional[str],
+    duration: Optional[int],
+    logger: logging.Logger,
+    duration_fn: Optional[Callable[[], Optional[int]]] = None,
+    exact: bool = True,
+    search: bool = True,
+) -> Optional[Tuple[Optional[str], bool]]:
+    """
+    Fetch lyrics from LRCLIB, consulting the on-disk cache first.
 
-    return None, False
+    Returns (lyrics_text, is_synced), where is_synced indicates that lyrics
+    are already in LRC-ish format with timestamps. Request errors propagate
+    and are not cached. Returns None, also uncached, when search is disabled
+    and the exact lookup found nothing (see query_lrclib).
+    """
+    if not title and not artist:
+        return None, False
+
+    key = LyricsCache.make_key(artist, title, album, duration)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.debug("Cache hit for %s - %s", artist, title)
+        return cached
+
+    result = query_lrclib(session, limiter, artist, title, album, duration, logger, duration_fn, exact, search)
+    if result is not None:
+        cache.put(key, *result)
+    return result
 
 
 def make_unsynced_lrc(plain_lyrics: str) -> str:
@@ -221,17 +562,96 @@ def make_unsynced_lrc(plain_lyrics: str) -> str:
     Turn plain text lyrics into a simple unsynced .lrc:
     we just stamp each line with [00:00.00].
     """
-    lines = plain_lyrics.splitlines()
-    out_lines = []
-    for line in lines:
-        if line.strip():
-            out_lines.append(f"[00:00.00] {line}")
-        else:
-            out_lines.append("")
-    return "\n".join(out_lines).rstrip() + "\n"
+    return "\n".join(
+        "[00:00.00] " + line if line.strip() else ""
+        for line in plain_lyrics.splitlines()
+    ).rstrip() + "\n"
+
+
+class LrcWriter:
+    """
+    Background threads that write .lrc files, so lookup workers never block
+    on disk. Several writers keep slow (network) storage busy while the next
+    requests are in flight. The queue is bounded to keep memory flat if the
+    disk falls behind.
+
+    Callers claim() a path before submitting it. Claims are made under a lock
+    on the calling thread, so two tracks mapping to the same .lrc (e.g.
+    song.flac and song.mp3) can't both queue a write, even though neither
+    write has landed on disk yet.
+    """
+
+    def __init__(self, logger: logging.Logger, workers: int = WRITE_WORKERS):
+        self._queue: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._logger = logger
+        self._claimed: set[Path] = set()
+        self._claim_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"lrc-writer-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def claim(self, path: Path, overwrite: bool) -> bool:
+        """
+        Reserve `path` for writing. False if it was already claimed this run,
+        or if it exists on disk and overwrite is off.
+        """
+        with self._claim_lock:
+            if path in self._claimed:
+                return False
+            if not overwrite and path.exists():
+                return False
+            self._claimed.add(path)
+            return True
+
+    def submit(self, path: Path, data: bytes) -> None:
+        self._queue.put((path, data))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            path, data = item
+            try:
+                self._write_atomic(path, data)
+                self._logger.info("Wrote %s", path)
+            except Exception as e:
+                self._logger.error("Failed to write %s: %s", path, e)
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        """
+        Write to a temp file in the same directory, then rename it over the
+        target, so a reader (or an interrupted run) never sees a partial .lrc.
+        """
+        # Unique per process and writer thread; a plain open keeps the umask
+        # permissions the old direct write produced.
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+
+    def close(self) -> None:
+        """
+        Flush all queued writes and stop the threads.
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
 
 
 def write_lrc_for_track(
+    writer: LrcWriter,
     track_path: Path,
     lyrics: str,
     is_synced: bool,
@@ -239,11 +659,11 @@ def write_lrc_for_track(
     logger: logging.Logger,
 ) -> None:
     """
-    Write the .lrc file next to the track with same basename.
+    Queue the .lrc file next to the track with same basename for writing.
     """
     lrc_path = track_path.with_suffix(".lrc")
 
-    if lrc_path.exists() and not overwrite:
+    if not writer.claim(lrc_path, overwrite):
         logger.info("Skipping existing .lrc: %s", lrc_path)
         return
 
@@ -252,11 +672,123 @@ def write_lrc_for_track(
     else:
         content = make_unsynced_lrc(lyrics)
 
-    try:
-        lrc_path.write_text(content, encoding="utf-8")
-        logger.info("Wrote %s", lrc_path)
-    except Exception as e:
-        logger.error("Failed to write %s: %s", lrc_path, e)
+    writer.submit(lrc_path, content.encode("utf-8"))
+
+# ---- Lyrics cache -----------------------------------------------------------
+
+
+class LyricsCache:
+    """
+    SQLite cache of LRCLIB lookups keyed by normalized (artist, title, album,
+    duration). Hits are kept forever; misses are remembered for MISS_TTL so
+    re-scans don't hammer the API for tracks it doesn't know.
+
+    Also records the (mtime, size) and outcome of each processed audio file,
+    so unchanged files with a remembered miss aren't re-opened on later scans.
+    Shared by all worker threads.
+    """
+
+    def __init__(self, path: Path):
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS lyr("
+                "key TEXT PRIMARY KEY, synced TEXT, plain TEXT, miss_ts INTEGER)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files("
+                "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, status TEXT, ts INTEGER)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        artist: Optional[str],
+        title: Optional[str],
+        album: Optional[str],
+        duration: Optional[int],
+    ) -> str:
+        # LRCLIB matches durations within ~2s, so bucket them the same way
+        bucket = "" if duration is None else str(duration // 2)
+        raw = f"{normalize(artist or '')}|{normalize(title or '')}|{normalize(album or '')}|{bucket}"
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Optional[str], bool]]:
+        """
+        Return the cached (lyrics_text, is_synced), (None, False) for a
+        remembered miss, or None if there is no usable entry.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced, plain, miss_ts FROM lyr WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        synced, plain, miss_ts = row
+        if synced:
+            return synced, True
+        if plain:
+            return plain, False
+        if miss_ts is not None and time.time() - miss_ts < MISS_TTL:
+            return None, False
+        return None
+
+    def put(self, key: str, lyrics: Optional[str], is_synced: bool) -> None:
+        synced = lyrics if lyrics and is_synced else None
+        plain = lyrics if lyrics and not is_synced else None
+        miss_ts = None if lyrics else int(time.time())
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lyr(key, synced, plain, miss_ts) VALUES (?, ?, ?, ?)",
+                (key, synced, plain, miss_ts),
+            )
+            self._pending += 1
+            if self._pending >= CACHE_COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+
+    def is_known_miss(self, path: str, mtime_ns: int, size: int) -> bool:
+        """
+        True if this exact file (same mtime and size) recently produced no lyrics.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, size, status, ts FROM files WHERE path = ?", (path,)
+            ).fetchone()
+
+        if row is None:
+            return False
+
+        c_mtime, c_size, status, ts = row
+        return (
+            c_mtime == mtime_ns
+            and c_size == size
+            and status == FILE_MISS
+            and time.time() - ts < MISS_TTL
+        )
+
+    def record_file(self, path: str, mtime_ns: int, size: int, status: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files(path, mtime_ns, size, status, ts) VALUES (?, ?, ?, ?, ?)",
+                (path, mtime_ns, size, status, int(time.time())),
+            )
+            self._pending += 1
+            if self._pending >= CACHE_COMMIT_EVERY:
+                self._conn.commit()
+                self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
 
 # ---- helpers for redundancy checker -----------------------------------------
 
@@ -294,75 +826,244 @@ def save_checked_albums(root: Path, new_albums: set[str]) -> None:
 # ---- Main logic -------------------------------------------------------------
 
 
-def process_library(root: Path, overwrite: bool, logger: logging.Logger) -> None:
+def make_session() -> requests.Session:
+    """
+    Build a session whose connection pool is large enough to keep one warm
+    connection per worker, with retries for transient server errors.
+    Throttling responses are left to AdaptiveLimiter.
+    """
     session = requests.Session()
-    
-    checked_albums = load_checked_albums(root)
-    logger.info("Loaded %d previously checked albums", len(checked_albums))
-    new_checked_albums: set[str] = set()
-    
-    for path in root.rglob("*"):
-        if not path.is_file():
-            continue
+    retries = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[502, 504],
+        respect_retry_after_header=False,
+        allowed_methods=["GET"],
+    )
+    adapter = HTTPAdapter(
+        pool_connections=MAX_WORKERS,
+        pool_maxsize=MAX_WORKERS * 2,
+        max_retries=retries,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
-        # Skip macOS resource-fork files like ._track.mp3
-        if path.name.startswith("._"):
-            continue
 
-        if path.suffix.lower() not in AUDIO_EXTS:
-            continue
-        
-        # Album key = directory containing the track, relative to root
-        try:
-            album_rel = str(path.parent.relative_to(root))
-        except ValueError:
-            # Fallback in weird cases
-            album_rel = str(path.parent)	
-		
-        # If this album has already been checked in a previous run, skip
-        if album_rel in checked_albums and not overwrite:
-            logger.debug("Album already checked, skipping: %s (%s)", album_rel, path)
-            continue
+def _extract(job: Tuple[int, str, str, bool]) -> Tuple[int, Tuple[Optional[str], Optional[str], Optional[str], Optional[int]]]:
+    """
+    Pool worker: read metadata for one track. Takes and returns plain,
+    picklable values; the index maps the result back to its pending track.
+    """
+    index, path_str, root_str, need_duration = job
+    return index, get_metadata(Path(path_str), Path(root_str), need_duration)
 
-        lrc_path = path.with_suffix(".lrc")
-        if lrc_path.exists() and not overwrite:
-            logger.debug("LRC exists, skipping: %s", path)
-            if album_rel not in checked_albums:
-                new_checked_albums.add(album_rel)
-            continue
 
-        artist, title, album, duration = get_metadata(path, root)
+def iter_metadata(
+    jobs: list[Tuple[int, str, str, bool]],
+    use_processes: bool,
+) -> Iterator[Tuple[int, Tuple[Optional[str], Optional[str], Optional[str], Optional[int]]]]:
+    """
+    Run _extract over jobs, on a process pool when there is real tag parsing
+    to spread across cores. The pool gets no more processes than there are
+    chunks of work, and small batches (one chunk or less) run inline.
+
+    Uses ProcessPoolExecutor so a worker dying mid-parse raises
+    BrokenProcessPool instead of hanging the run.
+    """
+    processes = min(os.cpu_count() or 1, -(-len(jobs) // METADATA_CHUNKSIZE))
+
+    if not use_processes or processes <= 1:
+        yield from map(_extract, jobs)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as procs:
+        yield from procs.map(_extract, jobs, chunksize=METADATA_CHUNKSIZE)
+
+
+def process_track(
+    session: requests.Session,
+    limiter: AdaptiveLimiter,
+    cache: LyricsCache,
+    writer: LrcWriter,
+    path: Path,
+    metadata: Tuple[Optional[str], Optional[str], Optional[str], Optional[int]],
+    overwrite: bool,
+    path_tags: bool,
+    exact: bool,
+    search: bool,
+    logger: logging.Logger,
+) -> Optional[str]:
+    """
+    Look up and write lyrics for a single track. Runs on a worker thread.
+
+    Returns FILE_WRITTEN or FILE_MISS, NEEDS_SEARCH if only the exact lookup
+    was allowed and it found nothing, or None if the lookup failed.
+    """
+    artist, title, album, duration = metadata
+
+    # Fully tagged tracks reach the search phase only after an exact miss,
+    # and were already logged then.
+    if (exact or not all(metadata)) and logger.isEnabledFor(logging.INFO):
         logger.info(
             "Processing: %s (artist=%r, title=%r, album=%r, duration=%r)",
             path, artist, title, album, duration,
         )
 
-        lyrics, is_synced = fetch_lyrics_from_lrclib(
+    try:
+        result = fetch_lyrics_from_lrclib(
             session=session,
+            limiter=limiter,
+            cache=cache,
             artist=artist,
             title=title,
             album=album,
             duration=duration,
             logger=logger,
+            duration_fn=partial(read_duration, path) if path_tags and duration is None else None,
+            exact=exact,
+            search=search,
         )
-		
-		# We attempted an API lookup for this album, mark it as checked.
-        # (Only matters for future runs; current run still processes all tracks.)
-        if album_rel not in checked_albums:
-            new_checked_albums.add(album_rel)
-
-        if not lyrics:
-            logger.warning("No lyrics found for %s", path)
+    except Exception as e:
+        logger.warning("LRCLIB request failed for %s - %s: %s", artist, title, e)
+        return None
+
+    if result is None:
+        return NEEDS_SEARCH
+
+    lyrics, is_synced = result
+
+    if not lyrics:
+        logger.warning("No lyrics found for %s", path)
+        return FILE_MISS
+
+    write_lrc_for_track(writer, path, lyrics, is_synced, overwrite, logger)
+    return FILE_WRITTEN
+
+
+def _track_status(future, path: Path, logger: logging.Logger) -> Optional[str]:
+    """
+    Result of a finished process_track future, logging unexpected errors.
+    """
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error("Failed to process %s: %s", path, e)
+        return None
+
+
+def process_library(root: Path, overwrite: bool, path_tags: bool, logger: logging.Logger) -> None:
+    session = make_session()
+    limiter = AdaptiveLimiter(INITIAL_CONCURRENCY, MAX_WORKERS)
+    cache = LyricsCache(root / CACHE_FILENAME)
+    writer = LrcWriter(logger)
+
+    checked_albums = load_checked_albums(root)
+    logger.info("Loaded %d previously checked albums", len(checked_albums))
+    new_checked_albums: set[str] = set()
+
+    # Collect candidate tracks first, then look them up concurrently.
+    pending: list[Tuple[Path, str, os.stat_result]] = []
+
+    for entry, lrc_exists in iter_audio(root):
+        # Album key = directory containing the track, relative to root.
+        # Plain string ops so skipped tracks never allocate a Path or stat.
+        album_rel = os.path.relpath(os.path.dirname(entry.path), root)
+
+        # If this album has already been checked in a previous run, skip
+        if album_rel in checked_albums and not overwrite:
+            logger.debug("Album already checked, skipping: %s (%s)", album_rel, entry.path)
+            continue
+
+        if lrc_exists and not overwrite:
+            logger.debug("LRC exists, skipping: %s", entry.path)
+            if album_rel not in checked_albums:
+                new_checked_albums.add(album_rel)
             continue
 
-        write_lrc_for_track(path, lyrics, is_synced, overwrite, logger)
+        path = Path(entry.path)
 
-        # Be nice to the API
-        time.sleep(SLEEP_BETWEEN_REQUESTS)
+        # Unchanged since a previous run found nothing for it: don't even open it
+        st = entry.stat()
+        if not overwrite and cache.is_known_miss(str(path), st.st_mtime_ns, st.st_size):
+            logger.debug("Unchanged since last miss, skipping: %s", path)
+            continue
 
-    save_checked_albums(root, new_checked_albums)
-    logger.info("Recorded %d newly checked albums", len(new_checked_albums))
+        pending.append((path, album_rel, st))
+
+    # Tag parsing is CPU-bound, so it runs on a process pool; each track's
+    # lookup is queued on the thread pool as soon as its metadata arrives.
+    # With --path-tags most tracks are never opened, so the pool's startup
+    # and pickling would cost more than it saves.
+    #
+    # Lookups run in two phases: first the cheap exact /api/get for every
+    # fully tagged track, then /api/search for the rest and for exact misses.
+    jobs = [(i, str(path), str(root), not path_tags) for i, (path, _, _) in enumerate(pending)]
+    lookup = partial(
+        process_track,
+        session=session,
+        limiter=limiter,
+        cache=cache,
+        writer=writer,
+        overwrite=overwrite,
+        path_tags=path_tags,
+        logger=logger,
+    )
+    finished: list[Tuple[int, Optional[str]]] = []
+
+    # Always flush queued writes and persist what was learned, even if a
+    # metadata worker blows up part-way through.
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            try:
+                exact_futures = {}
+                needs_search = []
+                for i, metadata in iter_metadata(jobs, use_processes=not path_tags):
+                    if all(metadata):
+                        future = pool.submit(
+                            lookup, path=pending[i][0], metadata=metadata, exact=True, search=False,
+                        )
+                        exact_futures[future] = (i, metadata)
+                    else:
+                        needs_search.append((i, metadata))
+
+                for future in as_completed(exact_futures):
+                    i, metadata = exact_futures[future]
+                    status = _track_status(future, pending[i][0], logger)
+                    if status == NEEDS_SEARCH:
+                        needs_search.append((i, metadata))
+                    else:
+                        finished.append((i, status))
+
+                search_futures = {
+                    pool.submit(
+                        lookup, path=pending[i][0], metadata=metadata, exact=False, search=True,
+                    ): i
+                    for i, metadata in needs_search
+                }
+                for future in as_completed(search_futures):
+                    i = search_futures[future]
+                    finished.append((i, _track_status(future, pending[i][0], logger)))
+            except BaseException:
+                # Ctrl-C or a failure: drop queued lookups instead of letting
+                # the executor run them all before the error surfaces.
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+    finally:
+        for i, status in finished:
+            path, album_rel, st = pending[i]
+            if status is not None:
+                cache.record_file(str(path), st.st_mtime_ns, st.st_size, status)
+
+            # We attempted an API lookup for this album, mark it as checked.
+            # (Only matters for future runs; current run still processes all tracks.)
+            if album_rel not in checked_albums:
+                new_checked_albums.add(album_rel)
 
+        writer.close()
+        cache.close()
+        save_checked_albums(root, new_checked_albums)
+    logger.info("Recorded %d newly checked albums", len(new_checked_albums))
 
 
 def main(argv=None) -> int:
@@ -379,11 +1080,18 @@ def main(argv=None) -> int:
         action="store_true",
         help="Overwrite existing .lrc files.",
     )
+    parser.add_argument(
+        "--path-tags",
+        action="store_true",
+        help="Trust artist/album/title from the folder layout when complete and skip "
+             "reading file tags (faster on slow disks; uses search instead of exact lookup).",
+    )
     parser.add_argument(
         "--verbose",
         "-v",
-        action="store_true",
-        help="Enable debug logging.",
+        action="count",
+        default=0,
+        help="Show progress (-v) or debug logging (-vv).",
     )
 
     args = parser.parse_args(argv)
@@ -394,14 +1102,16 @@ def main(argv=None) -> int:
         return 1
 
     logging.basicConfig(
-        level=logging.DEBUG if args.verbose else logging.INFO,
+        level=(logging.DEBUG if args.verbose >= 2 else
+               logging.INFO if args.verbose == 1 else
+               logging.WARNING),
         format="%(levelname)s: %(message)s",
     )
     logger = logging.getLogger("lyrics_to_lrc")
 
     logger.info("Scanning library at %s", root)
     logger.info("Audio extensions: %s", ", ".join(sorted(AUDIO_EXTS)))
-    process_library(root, overwrite=args.overwrite, logger=logger)
+    process_library(root, overwrite=args.overwrite, path_tags=args.path_tags, logger=logger)
     logger.info("Done.")
     return 0
 